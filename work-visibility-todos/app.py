@@ -1,9 +1,11 @@
 import streamlit as st
 import pandas as pd
+from datetime import datetime
 
 from auth import require_login, logout_button
 from db import (
     init_db,
+    cache_version,
     get_users,
     list_tasks,
     create_task,
@@ -11,34 +13,39 @@ from db import (
     delete_task,
     # items
     list_items,
+    get_items_progress,
     add_item,
-    update_item,
     toggle_item_done,
+    bulk_update_items,
     delete_item,
     move_item,
     # logs
     add_task_log,
     get_task_logs,
+    transaction,
 )
 
 st.set_page_config(page_title="Work Visibility - TODO", layout="wide")
 
 STATUS = ["Todo", "In Progress", "Blocked", "Done"]
 PRIORITY = ["Low", "Medium", "High"]
+STATUS_INDEX = {s: i for i, s in enumerate(STATUS)}
+PRIORITY_INDEX = {p: i for i, p in enumerate(PRIORITY)}
+LOG_PAGE_SIZE = 50
 
-def _badge(status: str) -> str:
-    return {
-        "Todo": "🟦 Todo",
-        "In Progress": "🟨 In Progress",
-        "Blocked": "🟥 Blocked",
-        "Done": "🟩 Done",
-    }.get(status, status)
+STATUS_BADGE = {
+    "Todo": "🟦 Todo",
+    "In Progress": "🟨 In Progress",
+    "Blocked": "🟥 Blocked",
+    "Done": "🟩 Done",
+}
 
 def main():
     init_db()
     user = require_login()
     users = get_users()
     usernames = [u["username"] for u in users]
+    username_index = {u: i for i, u in enumerate(usernames)}
 
     st.title("Work Visibility - TODO (Checklist)")
     st.caption("Create tasks, add checklist items, and track progress in one place.")
@@ -65,7 +72,7 @@ def main():
         title = st.text_input("Title *")
         desc = st.text_area("Description")
         tags = st.text_input("Tags (comma-separated)")
-        owner = st.selectbox("Owner", usernames, index=usernames.index(user["username"]))
+        owner = st.selectbox("Owner", usernames, index=username_index.get(user["username"], 0))
         priority = st.selectbox("Priority", PRIORITY, index=1)
         status = st.selectbox("Status", STATUS, index=0)
         due_date = st.date_input("Due date", value=None)
@@ -74,47 +81,47 @@ def main():
             if not title.strip():
                 st.error("Title is required.")
             else:
-                tid = create_task(
-                    title=title.strip(),
-                    description=desc.strip(),
-                    tags=tags.strip(),
-                    owner=owner,
-                    priority=priority,
-                    status=status,
-                    due_date=str(due_date) if due_date else None,
-                    created_by=user["username"],
-                )
-                add_task_log(tid, user["username"], f"Created task (status={status}, owner={owner})")
+                with transaction():
+                    tid = create_task(
+                        title=title.strip(),
+                        description=desc.strip(),
+                        tags=tags.strip(),
+                        owner=owner,
+                        priority=priority,
+                        status=status,
+                        due_date=str(due_date) if due_date else None,
+                        created_by=user["username"],
+                    )
+                    add_task_log(tid, user["username"], f"Created task (status={status}, owner={owner})")
                 st.success("Task created.")
                 st.rerun()
 
     # -----------------------------
     # Task list
     # -----------------------------
-    tasks = list_tasks(owners=owner_filter, statuses=status_filter, search=search.strip() or None)
+    tasks = list_tasks(cache_version("tasks"), owners=owner_filter, statuses=status_filter, search=search.strip() or None)
 
     st.subheader("Tasks")
     if not tasks:
         st.info("No tasks match your filters.")
         return
 
-    df = pd.DataFrame(tasks)
-    df["status_badge"] = df["status"].apply(_badge)
-
     # Show progress per task
-    progress = []
-    for tid in df["id"].tolist():
-        items = list_items(int(tid))
-        if len(items) == 0:
-            progress.append("—")
-        else:
-            done = sum(1 for it in items if it["is_done"])
-            progress.append(f"{done}/{len(items)}")
-    df["items_done"] = progress
-
-    view = df[["id", "status_badge", "title", "owner", "priority", "due_date", "items_done", "tags", "updated_at"]].rename(
-        columns={"status_badge": "status", "due_date": "due", "items_done": "items"}
-    )
+    progress = get_items_progress(cache_version("items"), [t["id"] for t in tasks])
+    view = [
+        {
+            "id": t["id"],
+            "status": STATUS_BADGE.get(t["status"], t["status"]),
+            "title": t["title"],
+            "owner": t["owner"],
+            "priority": t["priority"],
+            "due": t["due_date"],
+            "items": "{}/{}".format(*progress[t["id"]]) if t["id"] in progress else "—",
+            "tags": t["tags"],
+            "updated_at": t["updated_at"],
+        }
+        for t in tasks
+    ]
     st.dataframe(view, use_container_width=True, hide_index=True)
 
     st.divider()
@@ -123,8 +130,8 @@ def main():
     # Select a task to manage
     # -----------------------------
     st.subheader("Manage a task")
-    selected_id = st.selectbox("Select Task ID", options=df["id"].tolist())
-    task = df[df["id"] == selected_id].iloc[0].to_dict()
+    selected_id = st.selectbox("Select Task ID", options=[t["id"] for t in tasks])
+    task = next(t for t in tasks if t["id"] == selected_id)
 
     left, right = st.columns([2, 3], gap="large")
 
@@ -137,11 +144,13 @@ def main():
             t_title = st.text_input("Title", value=task["title"])
             t_desc = st.text_area("Description", value=task.get("description") or "")
             t_tags = st.text_input("Tags", value=task.get("tags") or "")
-            t_owner = st.selectbox("Owner", usernames, index=usernames.index(task["owner"]))
-            t_priority = st.selectbox("Priority", PRIORITY, index=PRIORITY.index(task["priority"]))
-            t_status = st.selectbox("Status", STATUS, index=STATUS.index(task["status"]))
+            # Keep an owner who is no longer a user selectable, so saving doesn't reassign the task
+            owner_options = usernames if task["owner"] in username_index else usernames + [task["owner"]]
+            t_owner = st.selectbox("Owner", owner_options, index=owner_options.index(task["owner"]))
+            t_priority = st.selectbox("Priority", PRIORITY, index=PRIORITY_INDEX[task["priority"]])
+            t_status = st.selectbox("Status", STATUS, index=STATUS_INDEX[task["status"]])
 
-            due_val = pd.to_datetime(task["due_date"]).date() if task["due_date"] else None
+            due_val = datetime.strptime(task["due_date"], "%Y-%m-%d").date() if task["due_date"] else None
             t_due = st.date_input("Due date", value=due_val)
 
             note = st.text_area("Log note (optional)", placeholder="e.g., Waiting for data from X")
@@ -151,23 +160,29 @@ def main():
             delete = c2.form_submit_button("Delete task")
 
             if save:
-                update_task_meta(
-                    task_id=int(selected_id),
-                    title=t_title.strip(),
-                    description=t_desc.strip(),
-                    tags=t_tags.strip(),
-                    owner=t_owner,
-                    priority=t_priority,
-                    status=t_status,
-                    due_date=str(t_due) if t_due else None,
-                    updated_by=user["username"],
-                )
-                if note.strip():
-                    add_task_log(int(selected_id), user["username"], note.strip())
+                new = {
+                    "title": t_title.strip(),
+                    "description": t_desc.strip(),
+                    "tags": t_tags.strip(),
+                    "owner": t_owner,
+                    "priority": t_priority,
+                    "status": t_status,
+                    "due_date": str(t_due) if t_due else None,
+                }
+                # "" and None both mean empty
+                changed = {k: v for k, v in new.items() if (v or None) != (task[k] or None)}
+
+                if not changed and not note.strip():
+                    st.info("No changes")
                 else:
-                    add_task_log(int(selected_id), user["username"], "Updated task meta")
-                st.success("Saved.")
-                st.rerun()
+                    with transaction():
+                        update_task_meta(int(selected_id), changed, updated_by=user["username"])
+                        if note.strip():
+                            add_task_log(int(selected_id), user["username"], note.strip())
+                        else:
+                            add_task_log(int(selected_id), user["username"], "Updated task meta")
+                    st.success("Saved.")
+                    st.rerun()
 
             if delete:
                 delete_task(int(selected_id))
@@ -179,15 +194,16 @@ def main():
     # -----------------------------
     with right:
         st.markdown("#### Checklist items")
-        items = list_items(int(selected_id))
+        items = list_items(cache_version("items"), int(selected_id))
 
         # Add item
         with st.form("add_item_form", clear_on_submit=True):
             new_text = st.text_input("New item")
             if st.form_submit_button("Add item"):
                 if new_text.strip():
-                    add_item(int(selected_id), new_text.strip(), created_by=user["username"])
-                    add_task_log(int(selected_id), user["username"], f"Added item: {new_text.strip()}")
+                    with transaction():
+                        add_item(int(selected_id), new_text.strip(), created_by=user["username"])
+                        add_task_log(int(selected_id), user["username"], f"Added item: {new_text.strip()}")
                     st.rerun()
                 else:
                     st.error("Item text cannot be empty.")
@@ -195,47 +211,96 @@ def main():
         if not items:
             st.caption("No items yet. Add the first checklist item above.")
         else:
-            # Render items with controls
-            for it in items:
-                row = st.columns([0.6, 6, 1, 1, 1])
-                with row[0]:
-                    checked = st.checkbox("done", value=bool(it["is_done"]), key=f"chk_{it['id']}", label_visibility="collapsed")
-                    if checked != bool(it["is_done"]):
-                        toggle_item_done(int(it["id"]), checked, updated_by=user["username"])
-                        add_task_log(int(selected_id), user["username"], f"Toggled item {'done' if checked else 'not done'}: {it['text']}")
-                        st.rerun()
-
-                with row[1]:
-                    edited = st.text_input("text", value=it["text"], key=f"txt_{it['id']}", label_visibility="collapsed")
-
-                with row[2]:
-                    if st.button("Save", key=f"save_{it['id']}"):
-                        if edited.strip():
-                            update_item(int(it["id"]), edited.strip(), updated_by=user["username"])
-                            add_task_log(int(selected_id), user["username"], f"Edited item: {edited.strip()}")
-                            st.rerun()
-                        else:
-                            st.error("Item text cannot be empty.")
-
-                with row[3]:
-                    if st.button("↑", key=f"up_{it['id']}"):
-                        move_item(int(it["id"]), direction="up")
-                        st.rerun()
-
-                with row[4]:
-                    if st.button("🗑", key=f"del_{it['id']}"):
-                        delete_item(int(it["id"]))
-                        add_task_log(int(selected_id), user["username"], f"Deleted item: {it['text']}")
-                        st.rerun()
+            # One form for the whole checklist: edits, deletes and moves are queued
+            # client-side and applied together, in one transaction, on submit
+            by_id = {it["id"]: it for it in items}
+            with st.form(f"items_bulk_{selected_id}"):
+                items_df = pd.DataFrame(items)[["id", "is_done", "text", "position"]]
+                edited_df = st.data_editor(
+                    items_df,
+                    column_config={
+                        "id": None,
+                        "position": None,
+                        "is_done": st.column_config.CheckboxColumn("done", default=False),
+                        "text": st.column_config.TextColumn("item", required=True),
+                    },
+                    num_rows="dynamic",
+                    hide_index=True,
+                    use_container_width=True,
+                    key=f"items_{selected_id}",
+                )
+                move_up = st.multiselect(
+                    "Move up",
+                    options=list(by_id),
+                    format_func=lambda i: by_id[i]["text"],
+                    key=f"move_up_{selected_id}",
+                )
+                save_items = st.form_submit_button("Save items")
+
+            if save_items:
+                updates, added, logs = [], [], []
+                for row in edited_df.itertuples(index=False):
+                    text = row.text.strip() if isinstance(row.text, str) else ""
+                    done = bool(row.is_done) if pd.notna(row.is_done) else False
+                    if pd.isna(row.id):
+                        if text:
+                            added.append((text, done))
+                        continue
+                    old = by_id[int(row.id)]
+                    if done != old["is_done"]:
+                        logs.append(f"Toggled item {'done' if done else 'not done'}: {old['text']}")
+                    if text != old["text"]:
+                        logs.append(f"Edited item: {text}")
+                    if done != old["is_done"] or text != old["text"]:
+                        updates.append((int(row.id), text, done))
+
+                kept = {int(i) for i in edited_df["id"].dropna()}
+                deleted = [it for it in items if it["id"] not in kept]
+
+                if any(not t for _, t, _ in updates):
+                    st.error("Item text cannot be empty.")
+                else:
+                    with transaction():
+                        bulk_update_items(updates, updated_by=user["username"])
+                        for it in deleted:
+                            delete_item(int(it["id"]))
+                            logs.append(f"Deleted item: {it['text']}")
+                        for item_id in move_up:
+                            if item_id in kept:
+                                move_item(int(item_id), direction="up")
+                        for text, done in added:
+                            iid = add_item(int(selected_id), text, created_by=user["username"])
+                            if done:
+                                toggle_item_done(iid, True, updated_by=user["username"])
+                            logs.append(f"Added item: {text}")
+                        for msg in logs:
+                            add_task_log(int(selected_id), user["username"], msg)
+                    # Drop the queued edits so they are not replayed onto the fresh rows
+                    st.session_state.pop(f"items_{selected_id}", None)
+                    st.session_state.pop(f"move_up_{selected_id}", None)
+                    st.rerun()
 
         st.divider()
-        st.markdown("#### Task log")
-        logs = get_task_logs(int(selected_id))
-        if not logs:
-            st.caption("No logs yet.")
-        else:
-            for lg in logs:
-                st.markdown(f"- **{lg['created_at']}** — `{lg['actor']}`: {lg['message']}")
+        with st.expander("Task log"):
+            off_key = f"log_off_{selected_id}"
+            offset = st.session_state.get(off_key, 0)
+            # One extra row tells us whether an older page exists
+            logs = get_task_logs(cache_version("logs"), int(selected_id), limit=LOG_PAGE_SIZE + 1, offset=offset)
+            has_older = len(logs) > LOG_PAGE_SIZE
+            logs = logs[:LOG_PAGE_SIZE]
+
+            if not logs:
+                st.caption("No logs yet.")
+            else:
+                st.markdown("\n".join(f"- **{lg['created_at']}** — `{lg['actor']}`: {lg['message']}" for lg in logs))
+
+            c1, c2 = st.columns(2)
+            if c1.button("Newer", key=f"log_newer_{selected_id}", disabled=offset == 0):
+                st.session_state[off_key] = max(0, offset - LOG_PAGE_SIZE)
+                st.rerun()
+            if c2.button("Older", key=f"log_older_{selected_id}", disabled=not has_older):
+                st.session_state[off_key] = offset + LOG_PAGE_SIZE
+                st.rerun()
 
 if __name__ == "__main__":
     main()
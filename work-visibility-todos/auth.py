@@ -2,11 +2,24 @@ import streamlit as st
 import hashlib
 import hmac
 
+_SCRYPT_PREFIX = "scrypt$"
+
 def _hash_password(pw: str, salt: str) -> str:
-    return hashlib.sha256((salt + pw).encode("utf-8")).hexdigest()
+    dk = hashlib.scrypt(pw.encode("utf-8"), salt=salt.encode("utf-8"), n=2**14, r=8, p=1, dklen=32)
+    return _SCRYPT_PREFIX + dk.hex()
+
+def _legacy_hash(pw: str, salt: str) -> str:
+    # sha256(salt + pw), fed incrementally so the two strings are never concatenated
+    h = hashlib.sha256(salt.encode("utf-8"))
+    h.update(pw.encode("utf-8"))
+    return h.hexdigest()
 
 def _verify(pw: str, expected_hash: str, salt: str) -> bool:
-    got = _hash_password(pw, salt)
+    # Hashes already in secrets predate scrypt; keep accepting them
+    if expected_hash.startswith(_SCRYPT_PREFIX):
+        got = _hash_password(pw, salt)
+    else:
+        got = _legacy_hash(pw, salt)
     return hmac.compare_digest(got, expected_hash)
 
 def require_login() -> dict:
@@ -43,3 +56,9 @@ def logout_button():
     if st.button("Logout"):
         st.session_state.pop("auth_user", None)
         st.rerun()
+
+if __name__ == "__main__":
+    # Print a password hash for secrets: python auth.py <salt>
+    import getpass
+    import sys
+    print(_hash_password(getpass.getpass("Password: "), sys.argv[1]))
@@ -1,32 +1,200 @@
 import streamlit as st
 import sqlite3
 import os
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Tuple
+
+# Resolved once at import rather than on every DB call
+DB_URL: Optional[str] = st.secrets.get("database_url", None)
+IS_PG = DB_URL is not None
+# Max concurrent Postgres connections; size it for the deployment's concurrent sessions
+PG_POOL_SIZE = int(st.secrets.get("db_pool_size", 10))
+# How long a session waits for a free pooled connection before giving up
+PG_POOL_WAIT_SECONDS = 30
+
+@dataclass(frozen=True)
+class Driver:
+    """
+    The parts of the SQL dialect that differ between psycopg2 and sqlite3.
+    """
+    placeholder: str  # DB-API paramstyle marker
+    returning: bool   # INSERT ... RETURNING id (else cursor.lastrowid)
+    pk: str           # auto-increment primary key column
+    bool_type: str    # column type for flags
+    false: str        # SQL literal for a false flag
 
-def _now() -> str:
-    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
+DRV = (
+    Driver("%s", True, "SERIAL PRIMARY KEY", "BOOLEAN", "FALSE")
+    if IS_PG
+    else Driver("?", False, "INTEGER PRIMARY KEY AUTOINCREMENT", "INTEGER", "0")
+)
+P = DRV.placeholder
+
+def _ph(n: int) -> str:
+    return ",".join([P] * n)
+
+_sqlite_lock = threading.RLock()
+_tx = threading.local()
 
-def _get_db_url() -> Optional[str]:
-    return st.secrets.get("database_url", None)
+# Stored as TEXT in this format; existing rows sort lexicographically by it, so keep it stable
+_TS_FORMAT = "%Y-%m-%d %H:%M:%S UTC"
+_last_ts: Tuple[int, str] = (-1, "")
 
+def _now() -> str:
+    # Timestamps have one-second resolution, so format each second only once
+    global _last_ts
+    sec = time.time_ns() // 1_000_000_000
+    if sec != _last_ts[0]:
+        _last_ts = (sec, time.strftime(_TS_FORMAT, time.gmtime(sec)))
+    return _last_ts[1]
+
+@st.cache_resource(show_spinner=False)
 def _connect():
-    db_url = _get_db_url()
-    if db_url:
-        import psycopg2
-        return psycopg2.connect(db_url)
+    """
+    Shared across reruns: a connection pool for Postgres, a single connection for sqlite.
+    """
+    if IS_PG:
+        from psycopg2.pool import ThreadedConnectionPool
+
+        # putconn() closes a returned connection once minconn are idle, so
+        # minconn = maxconn keeps every borrowed connection pooled
+        pool = ThreadedConnectionPool(PG_POOL_SIZE, PG_POOL_SIZE, DB_URL)
+        # getconn() raises PoolError when every connection is borrowed;
+        # callers wait on this semaphore for a free slot instead
+        pool.slots = threading.BoundedSemaphore(PG_POOL_SIZE)
+        return pool
     os.makedirs("data", exist_ok=True)
-    return sqlite3.connect("data/app.db", check_same_thread=False)
+    # autocommit mode: transactions are opened explicitly by transaction()
+    conn = sqlite3.connect("data/app.db", check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    # Per-connection settings, applied once since this connection is cached.
+    # WAL: readers don't block on the writer and commits need fewer fsyncs
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    # read pages through a 256 MiB mmap and keep up to 64 MiB of page cache
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+@contextmanager
+def _conn():
+    """
+    Borrow a connection for one unit of work. It is returned to the pool
+    (or left open, for sqlite) on exit rather than closed. Inside
+    transaction() the transaction's connection is reused.
+    """
+    tx_conn = getattr(_tx, "conn", None)
+    if tx_conn is not None:
+        yield tx_conn
+        return
 
+    res = _connect()
+    if IS_PG:
+        if not res.slots.acquire(timeout=PG_POOL_WAIT_SECONDS):
+            raise RuntimeError(
+                f"No database connection free after {PG_POOL_WAIT_SECONDS}s "
+                f"(pool size {PG_POOL_SIZE}; raise db_pool_size in secrets)"
+            )
+        try:
+            conn = res.getconn()
+            try:
+                yield conn
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                res.putconn(conn)
+        finally:
+            res.slots.release()
+    else:
+        with _sqlite_lock:
+            try:
+                yield res
+            except Exception:
+                res.rollback()
+                raise
+
+def _dict_cursor(conn):
+    """
+    Cursor whose rows can be read by column name (sqlite3.Row / RealDictRow).
+    """
+    if IS_PG:
+        from psycopg2.extras import RealDictCursor
+        return conn.cursor(cursor_factory=RealDictCursor)
+    return conn.cursor()
+
+@contextmanager
+def transaction():
+    """
+    Run the enclosed writes as one transaction on one connection and yield a cursor.
+    Nested calls join the outer transaction; only the outermost one commits.
+    """
+    if getattr(_tx, "conn", None) is not None:
+        yield _tx.conn.cursor()
+        return
+
+    with _conn() as conn:
+        if IS_PG:
+            conn.autocommit = False
+        else:
+            conn.execute("BEGIN IMMEDIATE")
+        _tx.conn, _tx.pending = conn, set()
+        try:
+            yield conn.cursor()
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            pending = _tx.pending
+            _tx.conn, _tx.pending = None, None
+        _invalidate(*pending)
+
+# Read accessors below are memoised with st.cache_data and take a leading
+# `version` argument (not `_version`: st.cache_data skips underscore-prefixed
+# arguments when hashing). Writes bump the version for the entity they touch so
+# the next rerun misses the cache; the TTL bounds staleness from other processes.
+_CACHE_TTL = 60
+_cache_version: Dict[str, int] = {"tasks": 0, "items": 0, "logs": 0}
+
+def cache_version(entity: str) -> int:
+    return _cache_version[entity]
+
+def _invalidate(*entities: str):
+    if getattr(_tx, "conn", None) is not None:
+        # defer until the surrounding transaction commits
+        _tx.pending.update(entities)
+        return
+    for e in entities:
+        _cache_version[e] += 1
+    if "tasks" in entities:
+        list_tasks.clear()
+    if "items" in entities:
+        list_items.clear()
+        get_items_progress.clear()
+    if "logs" in entities:
+        get_task_logs.clear()
+
+# Must match idx_tasks_search exactly for Postgres to use the index.
+_PG_SEARCH_VECTOR = "to_tsvector('simple', coalesce(title,'') || ' ' || coalesce(description,'') || ' ' || coalesce(tags,''))"
+
+@st.cache_resource(show_spinner=False)
 def init_db():
-    conn = _connect()
-    cur = conn.cursor()
-    is_pg = _get_db_url() is not None
+    """
+    Create tables and indexes. Runs once per process, not on every rerun:
+    CREATE INDEX IF NOT EXISTS still locks the table on Postgres.
+    """
+    with _conn() as conn:
+        cur = conn.cursor()
 
-    if is_pg:
-        cur.execute("""
+        cur.execute(f"""
         CREATE TABLE IF NOT EXISTS tasks (
-            id SERIAL PRIMARY KEY,
+            id {DRV.pk},
             title TEXT NOT NULL,
             description TEXT,
             tags TEXT,
@@ -40,12 +208,12 @@ def init_db():
             updated_at TEXT NOT NULL
         );
         """)
-        cur.execute("""
+        cur.execute(f"""
         CREATE TABLE IF NOT EXISTS task_items (
-            id SERIAL PRIMARY KEY,
+            id {DRV.pk},
             task_id INTEGER NOT NULL,
             text TEXT NOT NULL,
-            is_done BOOLEAN NOT NULL DEFAULT FALSE,
+            is_done {DRV.bool_type} NOT NULL DEFAULT {DRV.false},
             position INTEGER NOT NULL,
             created_by TEXT NOT NULL,
             created_at TEXT NOT NULL,
@@ -53,48 +221,9 @@ def init_db():
             updated_at TEXT NOT NULL
         );
         """)
-        cur.execute("""
+        cur.execute(f"""
         CREATE TABLE IF NOT EXISTS task_logs (
-            id SERIAL PRIMARY KEY,
-            task_id INTEGER NOT NULL,
-            actor TEXT NOT NULL,
-            message TEXT NOT NULL,
-            created_at TEXT NOT NULL
-        );
-        """)
-    else:
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS tasks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            description TEXT,
-            tags TEXT,
-            owner TEXT NOT NULL,
-            priority TEXT NOT NULL,
-            status TEXT NOT NULL,
-            due_date TEXT,
-            created_by TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            updated_by TEXT,
-            updated_at TEXT NOT NULL
-        );
-        """)
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS task_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            task_id INTEGER NOT NULL,
-            text TEXT NOT NULL,
-            is_done INTEGER NOT NULL DEFAULT 0,
-            position INTEGER NOT NULL,
-            created_by TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            updated_by TEXT,
-            updated_at TEXT NOT NULL
-        );
-        """)
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS task_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            id {DRV.pk},
             task_id INTEGER NOT NULL,
             actor TEXT NOT NULL,
             message TEXT NOT NULL,
@@ -102,8 +231,13 @@ def init_db():
         );
         """)
 
-    conn.commit()
-    conn.close()
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_owner_status_updated ON tasks(owner, status, updated_at DESC)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_items_task_position ON task_items(task_id, position, id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_logs_task_id ON task_logs(task_id, id DESC)")
+        if IS_PG:
+            cur.execute(f"CREATE INDEX IF NOT EXISTS idx_tasks_search ON tasks USING GIN ({_PG_SEARCH_VECTOR})")
+
+        conn.commit()
 
 def get_users() -> List[Dict[str, Any]]:
     cfg = st.secrets.get("auth", {})
@@ -113,348 +247,256 @@ def get_users() -> List[Dict[str, Any]]:
 # -----------------------
 # Tasks
 # -----------------------
+_RETURNING_ID = " RETURNING id" if DRV.returning else ""
+
+def _insert(cur, sql: str, params) -> int:
+    cur.execute(sql, params)
+    return int(cur.fetchone()[0] if DRV.returning else cur.lastrowid)
+
+INSERT_TASK = f"""
+    INSERT INTO tasks (title, description, tags, owner, priority, status, due_date, created_by, created_at, updated_by, updated_at)
+    VALUES ({_ph(11)}){_RETURNING_ID}
+"""
+DELETE_TASK = (
+    f"DELETE FROM task_items WHERE task_id={P}",
+    f"DELETE FROM task_logs WHERE task_id={P}",
+    f"DELETE FROM tasks WHERE id={P}",
+)
+
 def create_task(title, description, tags, owner, priority, status, due_date, created_by) -> int:
-    conn = _connect()
-    cur = conn.cursor()
-    now = _now()
-    is_pg = _get_db_url() is not None
+    with transaction() as cur:
+        now = _now()
 
-    if is_pg:
-        cur.execute(
-            """
-            INSERT INTO tasks (title, description, tags, owner, priority, status, due_date, created_by, created_at, updated_by, updated_at)
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            RETURNING id;
-            """,
-            (title, description, tags, owner, priority, status, due_date, created_by, now, created_by, now),
-        )
-        tid = cur.fetchone()[0]
-    else:
-        cur.execute(
-            """
-            INSERT INTO tasks (title, description, tags, owner, priority, status, due_date, created_by, created_at, updated_by, updated_at)
-            VALUES (?,?,?,?,?,?,?,?,?,?,?)
-            """,
+        tid = _insert(
+            cur,
+            INSERT_TASK,
             (title, description, tags, owner, priority, status, due_date, created_by, now, created_by, now),
         )
-        tid = cur.lastrowid
 
-    conn.commit()
-    conn.close()
-    return int(tid)
+        _invalidate("tasks")
+        return tid
 
-def list_tasks(owners: List[str], statuses: List[str], search: Optional[str]) -> List[Dict[str, Any]]:
-    conn = _connect()
-    cur = conn.cursor()
-    is_pg = _get_db_url() is not None
+_TASK_COLS = "id, title, description, tags, owner, priority, status, due_date, created_by, created_at, updated_by, updated_at"
 
-    clauses, params = [], []
+if IS_PG:
+    # = ANY() binds the whole list, so the SQL text only varies with which filters are on
+    def _in_list(col: str, values: List[str]) -> Tuple[str, List[Any]]:
+        return f"{col} = ANY(%s)", [list(values)]
 
-    if owners:
-        placeholders = ",".join(["%s" if is_pg else "?" for _ in owners])
-        clauses.append(f"owner IN ({placeholders})")
-        params.extend(owners)
+    def _search_clause(search: str) -> Tuple[str, List[Any]]:
+        return f"{_PG_SEARCH_VECTOR} @@ websearch_to_tsquery('simple', %s)", [search]
+else:
+    def _in_list(col: str, values: List[str]) -> Tuple[str, List[Any]]:
+        return f"{col} IN ({_ph(len(values))})", list(values)
 
-    if statuses:
-        placeholders = ",".join(["%s" if is_pg else "?" for _ in statuses])
-        clauses.append(f"status IN ({placeholders})")
-        params.extend(statuses)
+    def _search_clause(search: str) -> Tuple[str, List[Any]]:
+        like = f"%{search}%"
+        return "(title LIKE ? OR description LIKE ? OR tags LIKE ?)", [like, like, like]
 
+@st.cache_data(ttl=_CACHE_TTL, show_spinner=False)
+def list_tasks(version: int, owners: List[str], statuses: List[str], search: Optional[str]) -> List[Dict[str, Any]]:
+    # Only active filters go into the WHERE clause, so owner/status stay
+    # sargable against idx_tasks_owner_status_updated
+    clauses, params = [], []
+    for col, values in (("owner", owners), ("status", statuses)):
+        if values:
+            clause, args = _in_list(col, values)
+            clauses.append(clause)
+            params.extend(args)
     if search:
-        like = f"%{search}%"
-        if is_pg:
-            clauses.append("(title ILIKE %s OR description ILIKE %s OR tags ILIKE %s)")
-            params.extend([like, like, like])
-        else:
-            clauses.append("(title LIKE ? OR description LIKE ? OR tags LIKE ?)")
-            params.extend([like, like, like])
+        clause, args = _search_clause(search)
+        clauses.append(clause)
+        params.extend(args)
 
     where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
-    q = f"""
-        SELECT id, title, description, tags, owner, priority, status, due_date, created_by, created_at, updated_by, updated_at
-        FROM tasks
-        {where}
-        ORDER BY updated_at DESC;
-    """
-    cur.execute(q, params)
-    rows = cur.fetchall()
-    conn.close()
+    with _conn() as conn:
+        cur = _dict_cursor(conn)
+        cur.execute(f"SELECT {_TASK_COLS} FROM tasks {where} ORDER BY updated_at DESC", params)
+        return [dict(r) for r in cur.fetchall()]
 
-    cols = ["id","title","description","tags","owner","priority","status","due_date","created_by","created_at","updated_by","updated_at"]
-    return [dict(zip(cols, r)) for r in rows]
+_TASK_META_FIELDS = ("title", "description", "tags", "owner", "priority", "status", "due_date")
 
-def update_task_meta(task_id: int, title: str, description: str, tags: str, owner: str, priority: str, status: str, due_date: Optional[str], updated_by: str):
-    conn = _connect()
-    cur = conn.cursor()
-    now = _now()
-    is_pg = _get_db_url() is not None
+def update_task_meta(task_id: int, changes: Dict[str, Any], updated_by: str):
+    """
+    Update only the given columns (a subset of _TASK_META_FIELDS) plus updated_by/updated_at.
+    """
+    unknown = set(changes) - set(_TASK_META_FIELDS)
+    if unknown:
+        raise ValueError(f"Not task meta fields: {sorted(unknown)}")
+    if not changes:
+        return
 
-    if is_pg:
+    with transaction() as cur:
+        now = _now()
+        cols = [c for c in _TASK_META_FIELDS if c in changes]
+        assignments = ", ".join(f"{c}={P}" for c in cols + ["updated_by", "updated_at"])
         cur.execute(
-            """
-            UPDATE tasks
-            SET title=%s, description=%s, tags=%s, owner=%s, priority=%s, status=%s, due_date=%s, updated_by=%s, updated_at=%s
-            WHERE id=%s
-            """,
-            (title, description, tags, owner, priority, status, due_date, updated_by, now, task_id),
-        )
-    else:
-        cur.execute(
-            """
-            UPDATE tasks
-            SET title=?, description=?, tags=?, owner=?, priority=?, status=?, due_date=?, updated_by=?, updated_at=?
-            WHERE id=?
-            """,
-            (title, description, tags, owner, priority, status, due_date, updated_by, now, task_id),
+            f"UPDATE tasks SET {assignments} WHERE id={P}",
+            [changes[c] for c in cols] + [updated_by, now, task_id],
         )
 
-    conn.commit()
-    conn.close()
+        _invalidate("tasks")
 
 def delete_task(task_id: int):
-    conn = _connect()
-    cur = conn.cursor()
-    is_pg = _get_db_url() is not None
-
-    if is_pg:
-        cur.execute("DELETE FROM task_items WHERE task_id=%s", (task_id,))
-        cur.execute("DELETE FROM task_logs WHERE task_id=%s", (task_id,))
-        cur.execute("DELETE FROM tasks WHERE id=%s", (task_id,))
-    else:
-        cur.execute("DELETE FROM task_items WHERE task_id=?", (task_id,))
-        cur.execute("DELETE FROM task_logs WHERE task_id=?", (task_id,))
-        cur.execute("DELETE FROM tasks WHERE id=?", (task_id,))
+    with transaction() as cur:
+        for q in DELETE_TASK:
+            cur.execute(q, (task_id,))
 
-    conn.commit()
-    conn.close()
+        _invalidate("tasks", "items", "logs")
 
 # -----------------------
 # Items (list under task)
 # -----------------------
-def _next_position(cur, task_id: int, is_pg: bool) -> int:
-    if is_pg:
-        cur.execute("SELECT COALESCE(MAX(position), 0) FROM task_items WHERE task_id=%s", (task_id,))
-    else:
-        cur.execute("SELECT COALESCE(MAX(position), 0) FROM task_items WHERE task_id=?", (task_id,))
+INSERT_ITEM = f"""
+    INSERT INTO task_items (task_id, text, is_done, position, created_by, created_at, updated_by, updated_at)
+    VALUES ({_ph(8)}){_RETURNING_ID}
+"""
+NEXT_POSITION = f"SELECT COALESCE(MAX(position), 0) FROM task_items WHERE task_id={P}"
+LIST_ITEMS = f"""
+    SELECT id, task_id, text, is_done, position, created_by, created_at, updated_by, updated_at
+    FROM task_items
+    WHERE task_id={P}
+    ORDER BY position ASC, id ASC
+"""
+UPDATE_ITEM_TEXT = f"UPDATE task_items SET text={P}, updated_by={P}, updated_at={P} WHERE id={P}"
+UPDATE_ITEM_DONE = f"UPDATE task_items SET is_done={P}, updated_by={P}, updated_at={P} WHERE id={P}"
+UPDATE_ITEM = f"UPDATE task_items SET text={P}, is_done={P}, updated_by={P}, updated_at={P} WHERE id={P}"
+DELETE_ITEM = f"DELETE FROM task_items WHERE id={P}"
+ITEM_POSITION = f"SELECT task_id, position FROM task_items WHERE id={P}"
+PREV_ITEM = f"SELECT id, position FROM task_items WHERE task_id={P} AND position < {P} ORDER BY position DESC LIMIT 1"
+NEXT_ITEM = f"SELECT id, position FROM task_items WHERE task_id={P} AND position > {P} ORDER BY position ASC LIMIT 1"
+SWAP_POSITIONS = f"UPDATE task_items SET position = CASE id WHEN {P} THEN {P} WHEN {P} THEN {P} END WHERE id IN ({P}, {P})"
+
+def _next_position(cur, task_id: int) -> int:
+    cur.execute(NEXT_POSITION, (task_id,))
     return int(cur.fetchone()[0]) + 1
 
 def add_item(task_id: int, text: str, created_by: str) -> int:
-    conn = _connect()
-    cur = conn.cursor()
-    now = _now()
-    is_pg = _get_db_url() is not None
+    with transaction() as cur:
+        now = _now()
 
-    pos = _next_position(cur, task_id, is_pg)
+        pos = _next_position(cur, task_id)
 
-    if is_pg:
-        cur.execute(
-            """
-            INSERT INTO task_items (task_id, text, is_done, position, created_by, created_at, updated_by, updated_at)
-            VALUES (%s,%s,FALSE,%s,%s,%s,%s,%s)
-            RETURNING id;
-            """,
-            (task_id, text, pos, created_by, now, created_by, now),
-        )
-        iid = cur.fetchone()[0]
-    else:
-        cur.execute(
-            """
-            INSERT INTO task_items (task_id, text, is_done, position, created_by, created_at, updated_by, updated_at)
-            VALUES (?,?,?,?,?,?,?,?)
-            """,
-            (task_id, text, 0, pos, created_by, now, created_by, now),
-        )
-        iid = cur.lastrowid
+        iid = _insert(cur, INSERT_ITEM, (task_id, text, False, pos, created_by, now, created_by, now))
 
-    conn.commit()
-    conn.close()
-    return int(iid)
+        _invalidate("items")
+        return iid
 
-def list_items(task_id: int) -> List[Dict[str, Any]]:
-    conn = _connect()
-    cur = conn.cursor()
-    is_pg = _get_db_url() is not None
+@st.cache_data(ttl=_CACHE_TTL, show_spinner=False)
+def list_items(version: int, task_id: int) -> List[Dict[str, Any]]:
+    with _conn() as conn:
+        cur = _dict_cursor(conn)
+        cur.execute(LIST_ITEMS, (task_id,))
+        out = [dict(r) for r in cur.fetchall()]
 
-    if is_pg:
-        cur.execute(
-            """
-            SELECT id, task_id, text, is_done, position, created_by, created_at, updated_by, updated_at
-            FROM task_items
-            WHERE task_id=%s
-            ORDER BY position ASC, id ASC
-            """,
-            (task_id,),
-        )
-    else:
+        # Normalize is_done for sqlite (0/1) into bool
+        for it in out:
+            it["is_done"] = bool(it["is_done"])
+        return out
+
+@st.cache_data(ttl=_CACHE_TTL, show_spinner=False)
+def get_items_progress(version: int, task_ids: List[int]) -> Dict[int, Tuple[int, int]]:
+    """
+    Map task_id -> (done, total) for all given tasks in a single query.
+    Tasks without items are absent from the result.
+    """
+    if not task_ids:
+        return {}
+
+    with _conn() as conn:
+        cur = conn.cursor()
+
+        placeholders = _ph(len(task_ids))
         cur.execute(
-            """
-            SELECT id, task_id, text, is_done, position, created_by, created_at, updated_by, updated_at
+            f"""
+            SELECT task_id, COUNT(*), SUM(CASE WHEN is_done THEN 1 ELSE 0 END)
             FROM task_items
-            WHERE task_id=?
-            ORDER BY position ASC, id ASC
+            WHERE task_id IN ({placeholders})
+            GROUP BY task_id
             """,
-            (task_id,),
+            [int(t) for t in task_ids],
         )
-    rows = cur.fetchall()
-    conn.close()
-
-    cols = ["id","task_id","text","is_done","position","created_by","created_at","updated_by","updated_at"]
-    out = [dict(zip(cols, r)) for r in rows]
-
-    # Normalize is_done for sqlite (0/1) into bool
-    for it in out:
-        it["is_done"] = bool(it["is_done"])
-    return out
+        rows = cur.fetchall()
+        return {int(tid): (int(done or 0), int(total)) for tid, total, done in rows}
 
 def update_item(item_id: int, text: str, updated_by: str):
-    conn = _connect()
-    cur = conn.cursor()
-    now = _now()
-    is_pg = _get_db_url() is not None
-
-    if is_pg:
-        cur.execute(
-            "UPDATE task_items SET text=%s, updated_by=%s, updated_at=%s WHERE id=%s",
-            (text, updated_by, now, item_id),
-        )
-    else:
-        cur.execute(
-            "UPDATE task_items SET text=?, updated_by=?, updated_at=? WHERE id=?",
-            (text, updated_by, now, item_id),
-        )
-    conn.commit()
-    conn.close()
+    with transaction() as cur:
+        cur.execute(UPDATE_ITEM_TEXT, (text, updated_by, _now(), item_id))
+        _invalidate("items")
 
 def toggle_item_done(item_id: int, is_done: bool, updated_by: str):
-    conn = _connect()
-    cur = conn.cursor()
-    now = _now()
-    is_pg = _get_db_url() is not None
+    with transaction() as cur:
+        cur.execute(UPDATE_ITEM_DONE, (bool(is_done), updated_by, _now(), item_id))
+        _invalidate("items")
 
-    if is_pg:
-        cur.execute(
-            "UPDATE task_items SET is_done=%s, updated_by=%s, updated_at=%s WHERE id=%s",
-            (is_done, updated_by, now, item_id),
-        )
-    else:
-        cur.execute(
-            "UPDATE task_items SET is_done=?, updated_by=?, updated_at=? WHERE id=?",
-            (1 if is_done else 0, updated_by, now, item_id),
-        )
-    conn.commit()
-    conn.close()
+def bulk_update_items(updates: List[Tuple[int, str, bool]], updated_by: str):
+    """
+    Write (item_id, text, is_done) for many items in one batched call.
+    """
+    if not updates:
+        return
 
-def delete_item(item_id: int):
-    conn = _connect()
-    cur = conn.cursor()
-    is_pg = _get_db_url() is not None
+    with transaction() as cur:
+        now = _now()
+        rows = [(text, bool(done), updated_by, now, int(item_id)) for item_id, text, done in updates]
+        if IS_PG:
+            # psycopg2's executemany is one round trip per row; execute_batch sends them together
+            from psycopg2.extras import execute_batch
+            execute_batch(cur, UPDATE_ITEM, rows)
+        else:
+            cur.executemany(UPDATE_ITEM, rows)
+        _invalidate("items")
 
-    if is_pg:
-        cur.execute("DELETE FROM task_items WHERE id=%s", (item_id,))
-    else:
-        cur.execute("DELETE FROM task_items WHERE id=?", (item_id,))
-    conn.commit()
-    conn.close()
+def delete_item(item_id: int):
+    with transaction() as cur:
+        cur.execute(DELETE_ITEM, (item_id,))
+        _invalidate("items")
 
 def move_item(item_id: int, direction: str):
     """
     Swap position with previous/next item inside the same task.
     """
-    conn = _connect()
-    cur = conn.cursor()
-    is_pg = _get_db_url() is not None
-
-    # find current item
-    if is_pg:
-        cur.execute("SELECT task_id, position FROM task_items WHERE id=%s", (item_id,))
-    else:
-        cur.execute("SELECT task_id, position FROM task_items WHERE id=?", (item_id,))
-    row = cur.fetchone()
-    if not row:
-        conn.close()
-        return
-    task_id, pos = int(row[0]), int(row[1])
-
-    # find neighbor
-    if direction == "up":
-        if is_pg:
-            cur.execute(
-                "SELECT id, position FROM task_items WHERE task_id=%s AND position < %s ORDER BY position DESC LIMIT 1",
-                (task_id, pos),
-            )
-        else:
-            cur.execute(
-                "SELECT id, position FROM task_items WHERE task_id=? AND position < ? ORDER BY position DESC LIMIT 1",
-                (task_id, pos),
-            )
-    else:
-        if is_pg:
-            cur.execute(
-                "SELECT id, position FROM task_items WHERE task_id=%s AND position > %s ORDER BY position ASC LIMIT 1",
-                (task_id, pos),
-            )
-        else:
-            cur.execute(
-                "SELECT id, position FROM task_items WHERE task_id=? AND position > ? ORDER BY position ASC LIMIT 1",
-                (task_id, pos),
-            )
+    with transaction() as cur:
+        # find current item
+        cur.execute(ITEM_POSITION, (item_id,))
+        row = cur.fetchone()
+        if not row:
+            return
+        task_id, pos = int(row[0]), int(row[1])
 
-    nb = cur.fetchone()
-    if not nb:
-        conn.close()
-        return
+        # find neighbor
+        cur.execute(PREV_ITEM if direction == "up" else NEXT_ITEM, (task_id, pos))
+        nb = cur.fetchone()
+        if not nb:
+            return
 
-    nb_id, nb_pos = int(nb[0]), int(nb[1])
+        nb_id, nb_pos = int(nb[0]), int(nb[1])
 
-    # swap
-    if is_pg:
-        cur.execute("UPDATE task_items SET position=%s WHERE id=%s", (nb_pos, item_id))
-        cur.execute("UPDATE task_items SET position=%s WHERE id=%s", (pos, nb_id))
-    else:
-        cur.execute("UPDATE task_items SET position=? WHERE id=?", (nb_pos, item_id))
-        cur.execute("UPDATE task_items SET position=? WHERE id=?", (pos, nb_id))
+        # swap (single statement)
+        cur.execute(SWAP_POSITIONS, (item_id, nb_pos, nb_id, pos, item_id, nb_id))
 
-    conn.commit()
-    conn.close()
+        _invalidate("items")
 
 # -----------------------
 # Logs
 # -----------------------
-def add_task_log(task_id: int, actor: str, message: str):
-    conn = _connect()
-    cur = conn.cursor()
-    now = _now()
-    is_pg = _get_db_url() is not None
-
-    if is_pg:
-        cur.execute(
-            "INSERT INTO task_logs (task_id, actor, message, created_at) VALUES (%s,%s,%s,%s)",
-            (task_id, actor, message, now),
-        )
-    else:
-        cur.execute(
-            "INSERT INTO task_logs (task_id, actor, message, created_at) VALUES (?,?,?,?)",
-            (task_id, actor, message, now),
-        )
-    conn.commit()
-    conn.close()
+INSERT_LOG = f"INSERT INTO task_logs (task_id, actor, message, created_at) VALUES ({_ph(4)})"
+LIST_LOGS = f"""
+    SELECT id, task_id, actor, message, created_at FROM task_logs
+    WHERE task_id={P} ORDER BY id DESC LIMIT {P} OFFSET {P}
+"""
 
-def get_task_logs(task_id: int) -> List[Dict[str, Any]]:
-    conn = _connect()
-    cur = conn.cursor()
-    is_pg = _get_db_url() is not None
+def add_task_log(task_id: int, actor: str, message: str):
+    with transaction() as cur:
+        cur.execute(INSERT_LOG, (task_id, actor, message, _now()))
+        _invalidate("logs")
 
-    if is_pg:
-        cur.execute(
-            "SELECT id, task_id, actor, message, created_at FROM task_logs WHERE task_id=%s ORDER BY id DESC",
-            (task_id,),
-        )
-    else:
-        cur.execute(
-            "SELECT id, task_id, actor, message, created_at FROM task_logs WHERE task_id=? ORDER BY id DESC",
-            (task_id,),
-        )
-    rows = cur.fetchall()
-    conn.close()
-    cols = ["id","task_id","actor","message","created_at"]
-    return [dict(zip(cols, r)) for r in rows]
+@st.cache_data(ttl=_CACHE_TTL, show_spinner=False)
+def get_task_logs(version: int, task_id: int, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    Newest first, one page at a time.
+    """
+    with _conn() as conn:
+        cur = _dict_cursor(conn)
+        cur.execute(LIST_LOGS, (task_id, limit, offset))
+        return [dict(r) for r in cur.fetchall()]